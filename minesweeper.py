@@ -1,8 +1,7 @@
 import pygame
 import sys
 import numpy as np
-from scipy import signal
-import random
+from collections import deque
 """This is a minesweeper game coded as practice with pygame and OOP in general. Everything is
 made by myself, except for the SpriteSheet class."""
 
@@ -48,135 +47,121 @@ class Game:
         self.n_cells = n_cells_x * n_cells_y
         self.n_clicked_cells = 0
         self.cells = []
-        self.bombs = None
-        self.surround_grid = None
+        self.rng = np.random.default_rng()
+        self.is_clicked = np.zeros(self.n_cells, dtype=bool)        # will be True after clicking
+        self.is_bomb = np.zeros(self.n_cells, dtype=bool)           # will be True if set as bomb
+        self.surrounding = np.zeros(self.n_cells, dtype=np.int8)    # will contain number of surrounding bombs
+        self.is_flagged = np.zeros(self.n_cells, dtype=bool)        # will be True if right-clicked
+        self.neighbors = [[] for _ in range(self.n_cells)]         # in-bounds neighbour indices of every cell
+        self.board_surf = pygame.Surface((self.n_cells_x * TILE_SIZE, self.n_cells_y * TILE_SIZE))
+        self.dirty_rects = []                                       # cells changed since the last redraw
         for i in range(self.n_cells_x):
             for j in range(self.n_cells_y):
-                self.cells.append(Cell(i, j))
+                cell = Cell(i, j)
+                self.cells.append(cell)
+                self.board_surf.blit(sprites_dict.get('long'), cell.rect)   # pre-render the unclicked board
+                for di in (-1, 0, 1):
+                    for dj in (-1, 0, 1):
+                        ni, nj = i + di, j + dj
+                        if (di or dj) and 0 <= ni < self.n_cells_x and 0 <= nj < self.n_cells_y:
+                            self.neighbors[i * self.n_cells_y + j].append(ni * self.n_cells_y + nj)
         self.won = False
         self.lost = False
 
     def set_bombs(self, cell_no):
         # Set bombs and make sure that the clicked cell is no bomb
-        self.bombs = random.sample(range(self.n_cells-1), self.n_bombs)
-        self.bombs = [bomb + 1 if bomb >= cell_no else bomb for bomb in self.bombs]
-        self.surround_grid = self.count_surrounding_bombs()
-        for i, c in enumerate(self.cells):
-            if i in self.bombs:
-                c.is_bomb = True
-            else:
-                c.surrounding = self.surround_grid[i]
+        bombs = self.rng.choice(self.n_cells - 1, size=self.n_bombs, replace=False)
+        bombs[bombs >= cell_no] += 1
+        self.is_bomb[bombs] = True
+        self.surrounding[:] = self.count_surrounding_bombs()      # already 0 on the bomb locations
 
     def count_surrounding_bombs(self):
         """Counts bombs and return a numpy array with the number of bombs surrounding each cell.
         The value will be 0 on the bomb locations"""
-        bomb_grid = np.zeros((self.n_cells_x, self.n_cells_y))
-        for bomb in self.bombs:
-            bomb_grid[bomb // self.n_cells_y, bomb % self.n_cells_y] = 1    # generate 2d bomb grid
-        kernel = np.ones((3, 3), dtype=int)
-        kernel[1, 1] = 0
-        surround_grid = signal.convolve2d(bomb_grid, kernel, mode="same")
-
-        bomb_x, bomb_y = np.where(bomb_grid == 1)           # return 0 at bomb locations
-        for i in range(int(sum(sum(bomb_grid)))):
-            surround_grid[bomb_x[i], bomb_y[i]] = 0
-        return surround_grid.flatten()
-
-    def click_update_cell(self, clicked_cell):
-        """Calls the click_update() method if the cell if this cell was not clicked. Calls the update method for
-        the surrounding cells recursively if the cell value is 0"""
-        cell_no = self.n_cells_y * clicked_cell.x + clicked_cell.y
-
+        bomb_grid = self.is_bomb.reshape(self.n_cells_x, self.n_cells_y)    # 2d view of the bomb mask
+        padded = np.zeros((self.n_cells_x + 2, self.n_cells_y + 2), dtype=np.int8)
+        padded[1:-1, 1:-1] = bomb_grid
+        surround_grid = (padded[:-2, :-2] + padded[:-2, 1:-1] + padded[:-2, 2:] +     # sum of the 8 neighbours
+                         padded[1:-1, :-2] + padded[1:-1, 2:] +
+                         padded[2:, :-2] + padded[2:, 1:-1] + padded[2:, 2:])
+
+        surround_grid[bomb_grid] = 0                        # return 0 at bomb locations
+        return surround_grid.ravel()
+
+    def click_update_cell(self, cell_no):
+        """Clicks this cell if it was not clicked. Clicks the surrounding cells with a breadth-first flood fill
+        if the cell value is 0"""
         if self.n_clicked_cells == 0:                           # generates bombs if no cell is clicked yet.
             self.set_bombs(cell_no)
 
-        if clicked_cell.is_clicked:
+        if self.is_clicked[cell_no]:
             return
 
-        if clicked_cell.is_bomb:
+        if self.is_bomb[cell_no]:
             self.lost = True                                    # game is lost when bomb is clicked
-            for bomb_cell in self.cells:                        # clicks all cells with bombs to show solution
-                if bomb_cell.is_bomb:
-                    bomb_cell.click_update()
-
-        self.n_clicked_cells += clicked_cell.click_update()     # 'clicks' all surrounding cells if value is 0
-        if clicked_cell.surrounding == 0:
-            if clicked_cell.x != 0:
-                self.click_update_cell(self.cells[cell_no - self.n_cells_y])
-                if clicked_cell.y != 0:
-                    self.click_update_cell(self.cells[cell_no - self.n_cells_y - 1])
-                if clicked_cell.y != self.n_cells_y - 1:
-                    self.click_update_cell(self.cells[cell_no - self.n_cells_y + 1])
-
-            if clicked_cell.x != self.n_cells_x - 1:
-                self.click_update_cell(self.cells[cell_no + self.n_cells_y])
-                if clicked_cell.y != 0:
-                    self.click_update_cell(self.cells[cell_no + self.n_cells_y - 1])
-                if clicked_cell.y != self.n_cells_y - 1:
-                    self.click_update_cell(self.cells[cell_no + self.n_cells_y + 1])
-
-            if clicked_cell.y != 0:
-                self.click_update_cell(self.cells[cell_no - 1])
-
-            if clicked_cell.y != self.n_cells_y - 1:
-                self.click_update_cell(self.cells[cell_no + 1])
-
-
-class Cell(pygame.sprite.Sprite):
-    """Create a cell object that has no bomb or value. These are set by the game instance.
-        provide the x and y values of the grid, not of the pixels in the window."""
-    def __init__(self, x_cell, y_cell):
-        super().__init__()
-        self.x = x_cell
-        self.y = y_cell
-
-        #Set unclicked sprites at right position
-        self.surf = pygame.Surface((TILE_SIZE, TILE_SIZE))
-        self.image = sprites_dict.get('long')
-        self.pos = vec(TILE_SIZE * x_cell, TILE_SIZE * y_cell)
-        self.rect = self.surf.get_rect(topleft=(int(self.pos.x), int(self.pos.y)))
-        self.is_clicked = False     # will be True after clicking
-        self.is_bomb = False        # will be True if set as bomb
-        self.surrounding = None     # will contain number of surrounding bombs
-        self.is_flagged = False     # will be True if right-clicked
-
-    def click_update(self):
-        """Updates sprites if this cell is clicked and was not clicked before."""
-        self.is_clicked = True
-        if self.is_bomb:
-            self.image = sprites_dict.get('bomb')
-            return 0
-        else:
-            self.image = sprites_dict.get(str(int(self.surrounding)))
-            return 1                # change sprite to corresponding one with value
+            self.is_clicked[self.is_bomb] = True                # clicks all cells with bombs to show solution
+            for bomb_no in np.flatnonzero(self.is_bomb):
+                self.set_image(bomb_no, sprites_dict.get('bomb'))
+            return
 
-    def flag_update(self):
+        opened = [cell_no]                                      # 'clicks' all surrounding cells if value is 0
+        self.is_clicked[cell_no] = True
+        queue = deque(opened)
+        while queue:
+            cell_no = queue.popleft()
+            if self.surrounding[cell_no] != 0:
+                continue
+            for neighbour_no in self.neighbors[cell_no]:
+                if not self.is_clicked[neighbour_no] and not self.is_bomb[neighbour_no]:
+                    self.is_clicked[neighbour_no] = True        # mark when queued so every cell is queued once
+                    queue.append(neighbour_no)
+                    opened.append(neighbour_no)
+        self.n_clicked_cells += len(opened)
+        values = self.surrounding[opened].tolist()              # plain ints in one pass, no per-cell casts
+        for opened_no, value in zip(opened, values):            # change sprites to the ones with the values
+            self.set_image(opened_no, value_sprites[value])
+
+    def set_image(self, cell_no, image):
+        """Draw a new sprite for a cell on the board surface and mark the cell to be redrawn."""
+        rect = self.cells[cell_no].rect
+        self.board_surf.blit(image, rect)
+        self.dirty_rects.append(rect)
+
+    def flag_update(self, cell_no):
         """Update flag sprite whether a point is flagged or not and change cell sprite."""
-        if self.is_clicked:
+        if self.is_clicked[cell_no]:
             return
-        elif self.is_flagged:
-            self.image = sprites_dict.get('long')
-            self.is_flagged = False
+        elif self.is_flagged[cell_no]:
+            self.set_image(cell_no, sprites_dict.get('long'))
+            self.is_flagged[cell_no] = False
         else:
-            self.is_flagged = True
-            self.image = sprites_dict.get('flag')
+            self.is_flagged[cell_no] = True
+            self.set_image(cell_no, sprites_dict.get('flag'))
+
+
+class Cell:
+    """Create a cell with the rect it occupies on the board surface. The cell state is kept in the arrays of
+        the game instance. provide the x and y values of the grid, not of the pixels in the window."""
+    def __init__(self, x_cell, y_cell):
+        self.rect = pygame.Rect(TILE_SIZE * x_cell, TILE_SIZE * y_cell, TILE_SIZE, TILE_SIZE)
 
 
 def load_sprites(tilesize):
-    """Loads the sprite from the spritesheet and puts them in a dict."""
-    sprite_sheet = SpriteSheet('sprites\minesweeper_sprite_sheet.png')
+    """Loads the sprite from the spritesheet and puts them in a dict. The value sprites are also returned as
+    a tuple indexed by the number of surrounding bombs."""
+    sprite_sheet = SpriteSheet('sprites/minesweeper_sprite_sheet.png')
     sprite_names = ['long', 'flag', '0', 'bomb', '1', '2', '3', '4', '5', '6', '7', '8']
     sprite_list = sprite_sheet.load_strip([0, 0, 16, 16], 12)
     sprite_list_resized = []
     for image in sprite_list:
-        sprite_list_resized.append(pygame.transform.scale(image, (tilesize, tilesize)))
+        sprite_list_resized.append(pygame.transform.scale(image, (tilesize, tilesize)).convert())
     sprites_dict_out = dict(zip(sprite_names, sprite_list_resized))
-    return sprites_dict_out
+    value_sprites_out = tuple(sprites_dict_out[str(value)] for value in range(9))
+    return sprites_dict_out, value_sprites_out
 
 if __name__ == '__main__':
     # Initialize pygame
     pygame.init()
-    vec = pygame.math.Vector2
 
     # Set game and tile parameters
     N_X = 9
@@ -184,25 +169,22 @@ if __name__ == '__main__':
     N_BOMBS = 10
     N_CELLS = N_Y * N_X
     TILE_SIZE = 48
-    FPS = 60
     SIZE = (N_X * TILE_SIZE, N_Y * TILE_SIZE)
 
     # Fix display parameters
-    FramePerSec = pygame.time.Clock()
     screen = pygame.display.set_mode(SIZE)
     pygame.display.set_caption("Minesweeper v1")
 
     # Load images and start game
-    sprites_dict = load_sprites(TILE_SIZE)
+    sprites_dict, value_sprites = load_sprites(TILE_SIZE)
     game = Game(N_X, N_Y, N_BOMBS)
-    all_sprites = pygame.sprite.Group()
-    for cell in game.cells:
-        all_sprites.add(cell)
+    screen.blit(game.board_surf, (0, 0))                # the whole board is drawn with a single blit
+    pygame.display.update()
 
     while not(game.won or game.lost):
-        if game.n_clicked_cells == N_CELLS - N_BOMBS:        # check if game is won
-            game.won = True
-        for event in pygame.event.get():
+        redraw = False
+        event = pygame.event.wait()                     # sleep until there is input, nothing animates
+        for event in [event] + pygame.event.get():
             if event.type == pygame.QUIT:               # quit if x on the game gui is clicked
                 pygame.quit()                           # close the game window
             elif event.type == pygame.KEYDOWN:
@@ -210,30 +192,43 @@ if __name__ == '__main__':
                     pygame.quit()                       # close the game window
             if event.type == pygame.MOUSEBUTTONDOWN:    # check clicked cells
                 x, y = event.pos                        # obtain clicked pixel
-                for cell in game.cells:                 # check collision for every cell
-                    if cell.rect.collidepoint(x, y):
-                        if event.button == 1:           # click_update if left click
-                            game.click_update_cell(cell)
-                        if event.button == 3:           # flag_update if right click
-                            cell.flag_update()
-
-        all_sprites.draw(screen)
-        pygame.display.update()
-        FramePerSec.tick(FPS)
+                cx, cy = x // TILE_SIZE, y // TILE_SIZE  # obtain clicked cell from the grid position
+                if 0 <= cx < N_X and 0 <= cy < N_Y:
+                    cell_no = cx * N_Y + cy
+                    if event.button == 1:               # click_update if left click
+                        game.click_update_cell(cell_no)
+                    if event.button == 3:               # flag_update if right click
+                        game.flag_update(cell_no)
+            if event.type == pygame.VIDEOEXPOSE:        # window was uncovered and has to be redrawn
+                redraw = True
+
+            if not game.lost and game.n_clicked_cells == N_CELLS - N_BOMBS:   # check if game is won
+                game.won = True
+            if game.won or game.lost:                   # ignore the rest of the batch once the game has ended
+                break
+
+        if redraw:                                      # redraw the whole board if the window was exposed
+            screen.blit(game.board_surf, (0, 0))
+            pygame.display.update()
+        elif game.dirty_rects:                          # else only redraw the cells that changed
+            for rect in game.dirty_rects:
+                screen.blit(game.board_surf, rect, rect)
+            pygame.display.update(game.dirty_rects)
+        game.dirty_rects.clear()
 
 
     if game.won:
         print('You won the game you dream player')
         while True:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
+            event = pygame.event.wait()                 # sleep until the window is closed
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
 
     elif game.lost:
         print('You lost you mediocre player')
         while True:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
+            event = pygame.event.wait()                 # sleep until the window is closed
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()